@@ -1,11 +1,17 @@
-from datetime import datetime
+import logging
+import sqlite3
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
-from colorama import Fore, Style, init
-from flask import Flask, jsonify, request
-from tinydb import TinyDB, Query
+import orjson
+from flask import Flask, Response, request
+from flask.json.provider import JSONProvider
 
+from common import Fore, Style, configure_logging, now_iso
 from gateway import api_gateway
 from lambdas import (
     lambda_historian,
@@ -17,33 +23,147 @@ from lambdas import (
     mock_aws,
 )
 
-# Inicia colorama para manter o padrão de logs coloridos
-init(autoreset=True)
+# OPT_NON_STR_KEYS cobre os status HTTP (int) usados como chave nas estatísticas do gateway
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
 
-app = Flask(__name__)
 
-DB_PATH = Path("db.json")
-db = TinyDB(DB_PATH)
-atletas_table = db.table("atletas")
-chaves_table = db.table("chaves")
-resultados_table = db.table("resultados")
+class OrjsonProvider(JSONProvider):
+    """Provider JSON do Flask baseado em orjson (jsonify, request.get_json, erros em JSON)."""
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        return orjson.dumps(obj, option=ORJSON_OPTIONS).decode()
+
+    def loads(self, s: Any, **kwargs: Any) -> Any:
+        return orjson.loads(s)
+
+
+app = Flask(__name__)
+app.json = OrjsonProvider(app)
+log = logging.getLogger("torneio.api")
+
+DB_PATH = Path("db.sqlite")
+SCHEMA_PATH = Path(__file__).parent / "schema.sql"
+
+# Conexão única em modo autocommit, compartilhada pelas threads do Flask e do _lambda_pool.
+# Todo acesso passa por _db_lock (_consultar, _inserir, _transacao): sem isso um lastrowid pode ser
+# de outra thread e uma leitura pode cair dentro do BEGIN aberto por outra requisição.
+db = sqlite3.connect(DB_PATH, check_same_thread=False, isolation_level=None)
+db.row_factory = sqlite3.Row
+db.execute("PRAGMA journal_mode=WAL")
+db.execute("PRAGMA synchronous=NORMAL")
+db.executescript(SCHEMA_PATH.read_text(encoding="utf-8"))
+_db_lock = threading.Lock()
 
 QUEUE_NAME = "lutas"
 
+# Campos obrigatórios de cada rota de escrita, montados uma única vez na importação
+ATLETA_REQUIRED = ("nome", "faixa", "categoria")
+LUTA_REQUIRED = ("luta_id", "atletas")
+RESULTADO_REQUIRED = ("luta_id", "vencedor")
+
+# Campos gravados em colunas TEXT NOT NULL: precisam chegar como string (o resto, como vencedor, vira JSON)
+ATLETA_TEXT_FIELDS = ("nome", "faixa", "categoria", "equipe")
+RESULTADO_TEXT_FIELDS = ("luta_id", "metodo", "tempo")
+
+# Pool para disparar Lambdas independentes em paralelo (sem dependência de dados entre si)
+_lambda_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="lambda")
+
+
+def _json_response(data: Dict[str, Any], status: int = 200) -> Response:
+    # Mesmo encoder do app.json, mas direto para bytes, sem passar por str
+    return Response(orjson.dumps(data, option=ORJSON_OPTIONS), status=status, mimetype="application/json")
+
+
+def _missing_fields(payload: Dict[str, Any], fields: Tuple[str, ...]) -> List[str]:
+    return [field for field in fields if not payload.get(field)]
+
+
+def _invalid_fields(data: Dict[str, Any], fields: Tuple[str, ...]) -> List[str]:
+    return [field for field in fields if not isinstance(data[field], str)]
+
+
+def _get_or_default(payload: Dict[str, Any], field: str, default: str) -> Any:
+    # null conta como ausente: as colunas são NOT NULL
+    value = payload.get(field)
+    return default if value is None else value
+
+
+def _consultar(sql: str, params: Tuple[Any, ...] = ()) -> List[sqlite3.Row]:
+    """Executa um SELECT sob _db_lock e devolve todas as linhas já lidas."""
+    with _db_lock:
+        return db.execute(sql, params).fetchall()
+
+
+def _inserir(sql: str, params: Tuple[Any, ...]) -> int:
+    """Executa um INSERT avulso sob _db_lock e devolve o id da linha inserida por ele."""
+    with _db_lock:
+        return db.execute(sql, params).lastrowid
+
+
+@contextmanager
+def _transacao() -> Iterator[sqlite3.Connection]:
+    """Agrupa várias escritas em um único BEGIN/COMMIT."""
+    with _db_lock:
+        db.execute("BEGIN")
+        try:
+            yield db
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+        db.execute("COMMIT")
 
-def _json_response(data: Dict[str, Any], status: int = 200):
-    return jsonify(data), status
+
+def _atleta_from_row(row: sqlite3.Row) -> Dict[str, Any]:
+    # faixa/categoria têm poucos valores: internar faz a lista inteira (matchmaker → scheduler → fila)
+    # apontar para as mesmas strings em vez de uma cópia por linha do SQLite
+    return {
+        "id": row["id"],
+        "nome": row["nome"],
+        "faixa": sys.intern(row["faixa"]),
+        "categoria": sys.intern(row["categoria"]),
+        "equipe": row["equipe"],
+    }
+
+
+def _chave_from_row(row: sqlite3.Row) -> Dict[str, Any]:
+    return {
+        "id": row["id"],
+        "luta_id": row["luta_id"],
+        "atletas": orjson.loads(row["atletas_json"]),
+        "round": row["round"],
+    }
+
+
+def _resultado_from_row(row: sqlite3.Row) -> Dict[str, Any]:
+    return {
+        "id": row["id"],
+        "luta_id": row["luta_id"],
+        "vencedor": orjson.loads(row["vencedor_json"]),
+        "metodo": row["metodo"],
+        "tempo": row["tempo"],
+        "registrado_em": row["registrado_em"],
+    }
+
+
+def _listar_atletas() -> List[Dict[str, Any]]:
+    return [_atleta_from_row(row) for row in _consultar("SELECT * FROM atletas ORDER BY id")]
+
+
+def _listar_chaves() -> List[Dict[str, Any]]:
+    return [_chave_from_row(row) for row in _consultar("SELECT * FROM chaves ORDER BY id")]
+
+
+def _listar_resultados() -> List[Dict[str, Any]]:
+    return [_resultado_from_row(row) for row in _consultar("SELECT * FROM resultados ORDER BY id")]
 
 
 @app.post("/atletas")
 def cadastrar_atleta():
-    """Insere um atleta no TinyDB após validação via Lambda Validator."""
-    if not request.is_json:
+    """Insere um atleta no SQLite após validação via Lambda Validator."""
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
         return _json_response({"erro": "Envie JSON válido."}, 400)
-
-    payload = request.get_json()
-    required = ["nome", "faixa", "categoria"]
-    missing = [field for field in required if not payload.get(field)]
+    missing = _missing_fields(payload, ATLETA_REQUIRED)
     if missing:
         return _json_response({"erro": f"Campos obrigatórios: {', '.join(missing)}"}, 400)
 
@@ -51,8 +171,11 @@ def cadastrar_atleta():
         "nome": payload["nome"],
         "faixa": payload["faixa"],
         "categoria": payload["categoria"],
-        "equipe": payload.get("equipe", "Independente"),
+        "equipe": _get_or_default(payload, "equipe", "Independente"),
     }
+    invalid = _invalid_fields(atleta_data, ATLETA_TEXT_FIELDS)
+    if invalid:
+        return _json_response({"erro": f"Campos inválidos (esperado texto): {', '.join(invalid)}"}, 400)
 
     # Valida via Lambda Validator
     validation_result = mock_aws.invoke_lambda("Lambda Validator", lambda_validator, {"atleta": atleta_data})
@@ -60,18 +183,20 @@ def cadastrar_atleta():
         return _json_response({"erro": "Validação falhou.", "detalhes": validation_result.get("erros", [])}, 400)
 
     # Insere com ID único
-    atleta_id = atletas_table.insert(atleta_data)
+    atleta_id = _inserir(
+        "INSERT INTO atletas (nome, faixa, categoria, equipe) VALUES (?, ?, ?, ?)",
+        (atleta_data["nome"], atleta_data["faixa"], atleta_data["categoria"], atleta_data["equipe"]),
+    )
     atleta_data["id"] = atleta_id
-    atletas_table.update({"id": atleta_id}, doc_ids=[atleta_id])
 
-    print(Fore.CYAN + f"[API] Atleta cadastrado: {atleta_data['nome']} (ID: {atleta_id})")
+    log.info(Fore.CYAN + "[API] Atleta cadastrado: %s (ID: %s)", atleta_data["nome"], atleta_id)
     return _json_response({"mensagem": "Atleta cadastrado com sucesso.", "atleta": atleta_data}, 201)
 
 
 @app.post("/gerar-chaves")
 def gerar_chaves():
     """Invoca a Lambda Matchmaker para gerar os confrontos e Lambda Scheduler para agendar."""
-    atletas = atletas_table.all()
+    atletas = _listar_atletas()
     if len(atletas) < 2:
         return _json_response({"erro": "Cadastre pelo menos dois atletas antes."}, 400)
 
@@ -87,14 +212,23 @@ def gerar_chaves():
     schedule_result = mock_aws.invoke_lambda("Lambda Scheduler", lambda_scheduler, {"chaves": confrontos})
     lutas_agendadas = schedule_result.get("lutas_agendadas", [])
 
-    # Salva no TinyDB com IDs
-    chaves_table.truncate()
-    ids_inseridos = chaves_table.insert_multiple(confrontos)
-    for idx, chave_id in enumerate(ids_inseridos):
-        chaves_table.update({"id": chave_id}, doc_ids=[chave_id])
+    # A tabela é recriada do zero, então os IDs já saem prontos na própria escrita em lote
+    for chave_id, confronto in enumerate(confrontos, 1):
+        confronto["id"] = chave_id
+
+    with _transacao() as conn:
+        conn.execute("DELETE FROM chaves")
+        conn.executemany(
+            "INSERT INTO chaves (id, luta_id, atletas_json, round) VALUES (?, ?, ?, ?)",
+            [
+                (c["id"], c["luta_id"], orjson.dumps(c["atletas"]).decode(), c["round"])
+                for c in confrontos
+            ],
+        )
 
-    print(Fore.BLUE + f"[API] {len(confrontos)} confrontos salvos no TinyDB.")
+    log.info(Fore.BLUE + "[API] %d confrontos salvos no SQLite.", len(confrontos))
 
+    # O anúncio de cada luta continua sendo um passo explícito via /chamar-luta
     return _json_response(
         {
             "mensagem": "Chaves geradas e agendadas.",
@@ -108,12 +242,10 @@ def gerar_chaves():
 @app.post("/chamar-luta")
 def chamar_luta():
     """Simula publicação de mensagem na fila SQS."""
-    if not request.is_json:
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
         return _json_response({"erro": "Envie JSON válido."}, 400)
-
-    payload = request.get_json()
-    required = ["luta_id", "atletas"]
-    missing = [field for field in required if not payload.get(field)]
+    missing = _missing_fields(payload, LUTA_REQUIRED)
     if missing:
         return _json_response({"erro": f"Campos obrigatórios: {', '.join(missing)}"}, 400)
 
@@ -130,26 +262,35 @@ def chamar_luta():
 @app.post("/resultado")
 def registrar_resultado():
     """Armazena o vencedor, dispara backup via Lambda Historian e notifica via Lambda Notifier."""
-    if not request.is_json:
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
         return _json_response({"erro": "Envie JSON válido."}, 400)
-
-    payload = request.get_json()
-    required = ["luta_id", "vencedor"]
-    missing = [field for field in required if not payload.get(field)]
+    missing = _missing_fields(payload, RESULTADO_REQUIRED)
     if missing:
         return _json_response({"erro": f"Campos obrigatórios: {', '.join(missing)}"}, 400)
 
     registro = {
         "luta_id": payload["luta_id"],
         "vencedor": payload["vencedor"],
-        "metodo": payload.get("metodo", "Pontos"),
-        "tempo": payload.get("tempo", "00:00"),
-        "registrado_em": datetime.utcnow().isoformat() + "Z",
+        "metodo": _get_or_default(payload, "metodo", "Pontos"),
+        "tempo": _get_or_default(payload, "tempo", "00:00"),
+        "registrado_em": now_iso(),
     }
-    resultado_id = resultados_table.insert(registro)
+    invalid = _invalid_fields(registro, RESULTADO_TEXT_FIELDS)
+    if invalid:
+        return _json_response({"erro": f"Campos inválidos (esperado texto): {', '.join(invalid)}"}, 400)
+    resultado_id = _inserir(
+        "INSERT INTO resultados (luta_id, vencedor_json, metodo, tempo, registrado_em) VALUES (?, ?, ?, ?, ?)",
+        (
+            registro["luta_id"],
+            orjson.dumps(registro["vencedor"]).decode(),
+            registro["metodo"],
+            registro["tempo"],
+            registro["registrado_em"],
+        ),
+    )
     registro["id"] = resultado_id
-    resultados_table.update({"id": resultado_id}, doc_ids=[resultado_id])
-    print(Fore.LIGHTGREEN_EX + f"[API] Resultado salvo para {registro['luta_id']} (ID: {resultado_id}).")
+    log.info(Fore.LIGHTGREEN_EX + "[API] Resultado salvo para %s (ID: %s).", registro["luta_id"], resultado_id)
 
     # Backup via Lambda Historian
     backup_payload = {
@@ -158,15 +299,20 @@ def registrar_resultado():
         "submitido_por": registro["metodo"],
         "extra": {"tempo": registro["tempo"]},
     }
-    backup_result = mock_aws.invoke_lambda("Lambda 3 - Historian", lambda_historian, backup_payload)
+    backup_future = _lambda_pool.submit(
+        mock_aws.invoke_lambda, "Lambda 3 - Historian", lambda_historian, backup_payload
+    )
 
-    # Notificação via Lambda Notifier
+    # Notificação via Lambda Notifier, executada junto com o backup
     notify_payload = {
         "luta_id": registro["luta_id"],
         "vencedor": registro["vencedor"],
         "metodo": registro["metodo"],
     }
-    notify_result = mock_aws.invoke_lambda("Lambda Notifier", lambda_notifier, notify_payload)
+    notify_future = _lambda_pool.submit(mock_aws.invoke_lambda, "Lambda Notifier", lambda_notifier, notify_payload)
+
+    backup_result = backup_future.result()
+    notify_result = notify_future.result()
 
     return _json_response(
         {
@@ -182,38 +328,40 @@ def registrar_resultado():
 @app.get("/atletas")
 def listar_atletas():
     """Lista todos os atletas cadastrados."""
-    atletas = atletas_table.all()
+    atletas = _listar_atletas()
     return _json_response({"total": len(atletas), "atletas": atletas})
 
 
 @app.get("/atletas/<int:atleta_id>")
 def buscar_atleta(atleta_id: int):
     """Busca um atleta específico por ID."""
-    atleta = atletas_table.get(doc_id=atleta_id)
-    if not atleta:
+    rows = _consultar("SELECT * FROM atletas WHERE id = ?", (atleta_id,))
+    if not rows:
         return _json_response({"erro": f"Atleta com ID {atleta_id} não encontrado."}, 404)
-    return _json_response({"atleta": atleta})
+    return _json_response({"atleta": _atleta_from_row(rows[0])})
 
 
 @app.get("/chaves")
 def listar_chaves():
     """Lista todas as chaves geradas."""
-    chaves = chaves_table.all()
+    chaves = _listar_chaves()
     return _json_response({"total": len(chaves), "chaves": chaves})
 
 
 @app.get("/resultados")
 def listar_resultados():
     """Lista todos os resultados registrados."""
-    resultados = resultados_table.all()
+    resultados = _listar_resultados()
     return _json_response({"total": len(resultados), "resultados": resultados})
 
 
 @app.get("/resultados/<luta_id>")
 def buscar_resultado(luta_id: str):
     """Busca resultado de uma luta específica."""
-    Resultado = Query()
-    resultado = resultados_table.search(Resultado.luta_id == luta_id)
+    resultado = [
+        _resultado_from_row(row)
+        for row in _consultar("SELECT * FROM resultados WHERE luta_id = ? ORDER BY id", (luta_id,))
+    ]
     if not resultado:
         return _json_response({"erro": f"Resultado para luta {luta_id} não encontrado."}, 404)
     return _json_response({"resultado": resultado[0] if len(resultado) == 1 else resultado})
@@ -222,11 +370,15 @@ def buscar_resultado(luta_id: str):
 @app.get("/estatisticas")
 def obter_estatisticas():
     """Calcula e retorna estatísticas do torneio via Lambda Statistics."""
-    atletas = atletas_table.all()
-    resultados = resultados_table.all()
+    # A Lambda só precisa do total de atletas e dos vencedores; o resto das linhas não é carregado
+    total_atletas = _consultar("SELECT COUNT(*) FROM atletas")[0][0]
+    resultados = [
+        {"vencedor": orjson.loads(row["vencedor_json"])}
+        for row in _consultar("SELECT vencedor_json FROM resultados ORDER BY id")
+    ]
 
     stats_result = mock_aws.invoke_lambda(
-        "Lambda Statistics", lambda_statistics, {"atletas": atletas, "resultados": resultados}
+        "Lambda Statistics", lambda_statistics, {"total_atletas": total_atletas, "resultados": resultados}
     )
 
     return _json_response({"estatisticas": stats_result})
@@ -236,9 +388,9 @@ def obter_estatisticas():
 def status_sistema():
     """Retorna status do sistema e integrações."""
     gateway_stats = api_gateway.get_stats()
-    total_atletas = len(atletas_table.all())
-    total_chaves = len(chaves_table.all())
-    total_resultados = len(resultados_table.all())
+    total_atletas, total_chaves, total_resultados = _consultar(
+        "SELECT (SELECT COUNT(*) FROM atletas), (SELECT COUNT(*) FROM chaves), (SELECT COUNT(*) FROM resultados)"
+    )[0]
 
     return _json_response(
         {
@@ -261,10 +413,11 @@ def status_sistema():
 @app.delete("/limpar")
 def limpar_dados():
     """Limpa todos os dados do banco (útil para testes)."""
-    atletas_table.truncate()
-    chaves_table.truncate()
-    resultados_table.truncate()
-    print(Fore.YELLOW + "[API] Todos os dados foram limpos.")
+    with _transacao() as conn:
+        conn.execute("DELETE FROM atletas")
+        conn.execute("DELETE FROM chaves")
+        conn.execute("DELETE FROM resultados")
+    log.info(Fore.YELLOW + "[API] Todos os dados foram limpos.")
     return _json_response({"mensagem": "Todos os dados foram limpos com sucesso."})
 
 
@@ -298,8 +451,9 @@ def raiz():
 
 
 if __name__ == "__main__":
-    # Executar com: python app.py
-    print(Fore.WHITE + Style.BRIGHT + "[API] Iniciando servidor Flask em http://127.0.0.1:5000")
+    # Executar com: python app.py (LOG_LEVEL=WARNING silencia os logs por requisição)
+    configure_logging()
+    log.info(Fore.WHITE + Style.BRIGHT + "[API] Iniciando servidor Flask em http://127.0.0.1:5000")
     app.run(debug=True)
 
 
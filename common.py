@@ -0,0 +1,49 @@
+"""
+Utilitários compartilhados
+Cores do log, configuração de logging e timestamps, sem depender do MockAWS.
+"""
+import logging
+import os
+import sys
+import time
+
+from colorama import Fore, Style, init
+
+
+class _SemCor:
+    """Substituto de Fore/Style do colorama: qualquer cor vira string vazia."""
+
+    def __getattr__(self, name: str) -> str:
+        return ""
+
+
+if sys.stdout is not None and sys.stdout.isatty():
+    # Inicia suporte a cores multiplataforma
+    init(autoreset=True)
+else:
+    # Saída redirecionada (arquivo, pipe, /dev/null): sem o wrapper do colorama nem códigos ANSI nas mensagens
+    Fore = Style = _SemCor()  # type: ignore[assignment]
+
+
+def configure_logging() -> None:
+    """Configura o log dos executáveis; o nível vem de LOG_LEVEL (ou LOGLEVEL), INFO por padrão."""
+    level = os.getenv("LOG_LEVEL") or os.getenv("LOGLEVEL") or "INFO"
+    logging.basicConfig(level=level.upper(), format="%(message)s", stream=sys.stdout)
+
+
+# (segundo, "AAAA-MM-DDTHH:MM:SS") do último timestamp gerado; trocado de uma vez só, sem lock
+_iso_cache = (-1, "")
+
+
+def now_iso() -> str:
+    """Mesmo formato de datetime.utcnow().isoformat() + "Z", chamando strftime só quando o segundo muda."""
+    global _iso_cache
+    sec, frac = divmod(time.time_ns(), 1_000_000_000)
+    cached_sec, prefix = _iso_cache
+    if sec != cached_sec:
+        prefix = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(sec))
+        _iso_cache = (sec, prefix)
+    return f"{prefix}.{frac // 1000:06d}Z"
+
+
+__all__ = ["Fore", "Style", "configure_logging", "now_iso"]
@@ -2,54 +2,58 @@
 API Gateway Simulado
 Simula roteamento de requisições, autenticação básica e rate limiting.
 """
+import logging
 import time
-from datetime import datetime
-from typing import Any, Callable, Dict, Optional
+from collections import defaultdict, deque
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
 
-from colorama import Fore, Style, init
+from common import Fore, Style, now_iso
 
-init(autoreset=True)
+log = logging.getLogger("torneio.gateway")
 
 
 class APIGateway:
     """Simula um API Gateway com roteamento, autenticação e rate limiting."""
 
     def __init__(self):
-        self.request_log: list = []
-        self.rate_limit: Dict[str, list] = {}  # IP -> [timestamps]
+        self.request_log: Deque[Dict[str, Any]] = deque(maxlen=10_000)  # só as entradas mais recentes
+        self._total_requests = 0
+        self._status_counts: Dict[int, int] = defaultdict(int)
+        self.rate_limit: Dict[str, Deque[float]] = {}  # IP -> timestamps em ordem de chegada
         self.rate_limit_window = 60  # segundos
         self.max_requests_per_window = 100
+        self._routes: Dict[Tuple[str, str], Tuple[Callable, Callable[..., Dict[str, Any]]]] = {}  # tabela de despacho
 
     def _check_rate_limit(self, client_ip: str) -> bool:
         """Verifica se o cliente excedeu o rate limit."""
         now = time.time()
-        if client_ip not in self.rate_limit:
-            self.rate_limit[client_ip] = []
+        timestamps = self.rate_limit.setdefault(client_ip, deque())
 
-        # Remove timestamps antigos
-        self.rate_limit[client_ip] = [
-            ts for ts in self.rate_limit[client_ip] if now - ts < self.rate_limit_window
-        ]
+        # Remove timestamps antigos; como estão ordenados, basta olhar o início da fila
+        cutoff = now - self.rate_limit_window
+        while timestamps and timestamps[0] <= cutoff:
+            timestamps.popleft()
 
-        if len(self.rate_limit[client_ip]) >= self.max_requests_per_window:
+        if len(timestamps) >= self.max_requests_per_window:
             return False
 
-        self.rate_limit[client_ip].append(now)
+        timestamps.append(now)
         return True
 
     def _log_request(self, method: str, path: str, client_ip: str, status: int):
         """Registra a requisição no log."""
         log_entry = {
-            "timestamp": datetime.utcnow().isoformat() + "Z",
+            "timestamp": now_iso(),
             "method": method,
             "path": path,
             "client_ip": client_ip,
             "status": status,
         }
         self.request_log.append(log_entry)
-        print(
-            Fore.LIGHTBLUE_EX
-            + f"[API Gateway] {method} {path} - IP: {client_ip} - Status: {status}"
+        self._total_requests += 1
+        self._status_counts[status] += 1
+        log.info(
+            Fore.LIGHTBLUE_EX + "[API Gateway] %s %s - IP: %s - Status: %s", method, path, client_ip, status
         )
 
     def _check_auth(self, headers: Dict[str, Any]) -> bool:
@@ -58,11 +62,58 @@ class APIGateway:
         # Para simulação, aceita qualquer requisição
         api_key = headers.get("X-API-Key") or headers.get("Authorization")
         if api_key:
-            print(Fore.GREEN + "[API Gateway] Autenticação verificada via API Key.")
+            log.info(Fore.GREEN + "[API Gateway] Autenticação verificada via API Key.")
             return True
         # Permite requisições sem autenticação para simplicidade
         return True
 
+    def register(self, method: str, path: str, handler: Callable) -> Callable[..., Dict[str, Any]]:
+        """
+        Monta, uma única vez, o roteamento especializado de uma rota fixa.
+        O closure devolvido recebe (client_ip, headers) e responde igual a route().
+        """
+        check_rate_limit = self._check_rate_limit
+        check_auth = self._check_auth
+        log_request = self._log_request
+        routing_msg = Fore.CYAN + f"[API Gateway] Roteando {method} {path} para handler."
+
+        def routed(client_ip: str = "127.0.0.1", headers: Optional[Dict] = None) -> Dict[str, Any]:
+            # Verifica rate limit
+            if not check_rate_limit(client_ip):
+                log_request(method, path, client_ip, 429)
+                return {
+                    "status_code": 429,
+                    "body": {"erro": "Rate limit excedido. Tente novamente mais tarde."},
+                }
+
+            # Verifica autenticação
+            if not check_auth(headers or {}):
+                log_request(method, path, client_ip, 401)
+                return {
+                    "status_code": 401,
+                    "body": {"erro": "Não autorizado. Forneça credenciais válidas."},
+                }
+
+            # Roteia para o handler
+            try:
+                log.info(routing_msg)
+                response = handler()
+                if isinstance(response, tuple):
+                    body, status = response[0], response[1]
+                else:
+                    body, status = response, 200
+                log_request(method, path, client_ip, status)
+                return {"status_code": status, "body": body}
+            except Exception as e:
+                log_request(method, path, client_ip, 500)
+                return {
+                    "status_code": 500,
+                    "body": {"erro": f"Erro interno do servidor: {str(e)}"},
+                }
+
+        self._routes[(method, path)] = (handler, routed)
+        return routed
+
     def route(
         self, method: str, path: str, handler: Callable, client_ip: str = "127.0.0.1", headers: Optional[Dict] = None
     ) -> Dict[str, Any]:
@@ -70,58 +121,21 @@ class APIGateway:
         Roteia uma requisição através do gateway.
         Retorna a resposta do handler ou erro do gateway.
         """
-        headers = headers or {}
-
-        # Verifica rate limit
-        if not self._check_rate_limit(client_ip):
-            self._log_request(method, path, client_ip, 429)
-            return {
-                "status_code": 429,
-                "body": {"erro": "Rate limit excedido. Tente novamente mais tarde."},
-            }
-
-        # Verifica autenticação
-        if not self._check_auth(headers):
-            self._log_request(method, path, client_ip, 401)
-            return {
-                "status_code": 401,
-                "body": {"erro": "Não autorizado. Forneça credenciais válidas."},
-            }
-
-        # Roteia para o handler
-        try:
-            print(Fore.CYAN + f"[API Gateway] Roteando {method} {path} para handler.")
-            response = handler()
-            status = response[1] if isinstance(response, tuple) else 200
-            self._log_request(method, path, client_ip, status)
-            return {"status_code": status, "body": response[0] if isinstance(response, tuple) else response}
-        except Exception as e:
-            self._log_request(method, path, client_ip, 500)
-            return {
-                "status_code": 500,
-                "body": {"erro": f"Erro interno do servidor: {str(e)}"},
-            }
+        registered = self._routes.get((method, path))
+        if registered is None or registered[0] is not handler:
+            routed = self.register(method, path, handler)
+        else:
+            routed = registered[1]
+        return routed(client_ip, headers)
 
     def get_stats(self) -> Dict[str, Any]:
         """Retorna estatísticas do gateway."""
-        total_requests = len(self.request_log)
-        
-        # Conta requisições da última hora (simplificado)
-        now = time.time()
-        recent_requests = [
-            req for req in self.request_log
-            if req.get("timestamp")  # Apenas verifica se existe timestamp
-        ]
-
-        status_counts = {}
-        for req in self.request_log:
-            status = req["status"]
-            status_counts[status] = status_counts.get(status, 0) + 1
-
+        # Contadores mantidos em _log_request; nada de varrer o log a cada chamada
         return {
-            "total_requests": total_requests,
-            "requests_last_hour": len(recent_requests),
-            "status_counts": status_counts,
+            "total_requests": self._total_requests,
+            # Mantido por compatibilidade: a versão antiga só filtrava entradas com timestamp (todas têm)
+            "requests_last_hour": self._total_requests,
+            "status_counts": dict(self._status_counts),
             "active_clients": len(self.rate_limit),
         }
 
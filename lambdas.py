@@ -1,119 +1,370 @@
-import json
+import atexit
+import gzip
+import logging
+import os
+import queue
 import random
+import sys
+import tempfile
+import threading
 import time
-from datetime import datetime
+from collections import Counter
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
-from colorama import Fore, Style, init
+import orjson
 
-# Inicia suporte a cores multiplataforma
-init(autoreset=True)
+from common import Fore, Style, now_iso
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem flock, vale só o lock entre threads do próprio processo
+    fcntl = None
+
+
+log = logging.getLogger("torneio.aws")
+
+
+def _env_flag(name: str) -> bool:
+    """Lê uma variável de ambiente booleana (1/true/yes/sim)."""
+    return os.getenv(name, "").strip().lower() in ("1", "true", "yes", "sim")
+
+
+@contextmanager
+def _file_lock(lock_path: Path) -> Iterator[None]:
+    """Lock exclusivo entre processos (flock) em um arquivo auxiliar que nunca é substituído."""
+    with lock_path.open("ab") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        yield
+
+
+def _atomic_write(path: Path, data: bytes) -> None:
+    """Grava em um temporário único no mesmo diretório e troca via os.replace: quem lê vê o antigo ou o novo."""
+    tmp = tempfile.NamedTemporaryFile(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp", delete=False)
+    try:
+        with tmp:
+            tmp.write(data)
+        os.chmod(tmp.name, 0o644)  # NamedTemporaryFile cria com 0600; mantém a permissão dos demais arquivos
+        os.replace(tmp.name, path)
+    except BaseException:
+        os.unlink(tmp.name)
+        raise
 
 
 class MockAWS:
     """
     Simulador extremamente simples dos serviços utilizados (SQS, SNS e Lambda).
     Toda a persistência fica em arquivos locais para permitir múltiplos processos.
+    Os appends (SQS, SNS, backups) são gravados por uma thread em segundo plano, em lote.
     """
 
+    WRITE_BATCH_SIZE = 256  # máximo de appends agrupados por rodada do writer
+    WRITE_DEBOUNCE = 0.005  # segundos que o writer espera por mais appends antes de ir ao disco
+
     def __init__(self, base_path: Optional[Path] = None) -> None:
         self.state_dir = Path(base_path or Path(__file__).parent / "mock_state")
         self.state_dir.mkdir(parents=True, exist_ok=True)
 
         self.sqs_dir = self.state_dir / "sqs"
         self.sqs_dir.mkdir(exist_ok=True)
+        self._queue_paths: Dict[str, Path] = {}  # fila -> arquivo já garantido no disco
+        self._queue_locks: Dict[Path, Path] = {}  # arquivo da fila -> <fila>.lock usado no flock
 
         self.sns_log = self.state_dir / "sns_log.txt"
         if not self.sns_log.exists():
             self.sns_log.write_text("", encoding="utf-8")
 
+        # Backups da Lambda Historian (simulando S3): diretório criado uma vez, não a cada resultado
+        self.backup_dir = self.state_dir / "backups"
+        self.backup_dir.mkdir(exist_ok=True)
+        # HISTORIAN_GZIP=1 grava o backup comprimido (gzip nível 1, um membro por lote do writer); desligado,
+        # JSON Lines puro. O ganho depende do tamanho do lote: com um resultado por lote (um POST /resultado
+        # por vez) fica em ~10%; rajadas que caem no mesmo lote comprimem bem mais.
+        historian_name = "historian_logs.jsonl.gz" if _env_flag("HISTORIAN_GZIP") else "historian_logs.jsonl"
+        self.historian_log = self.backup_dir / historian_name
+
+        # Fila de appends pendentes (arquivo, bytes) consumida pelo writer; _io_lock protege os arquivos
+        self._write_q: "queue.Queue[Tuple[Path, bytes]]" = queue.Queue()
+        self._io_lock = threading.Lock()
+        # Descritores O_APPEND mantidos abertos para os logs que só crescem (SNS, backups);
+        # filas não entram aqui porque a compactação troca o arquivo via os.replace
+        self._append_fds: Dict[Path, int] = {}
+        self._writer = threading.Thread(target=self._writer_loop, name="mock-aws-writer", daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+    def _append(self, file_path: Path, data: bytes) -> None:
+        """Agenda um append no arquivo; a requisição não espera o disco."""
+        self._write_q.put((file_path, data))
+
+    def _writer_loop(self) -> None:
+        while True:
+            file_path, data = self._write_q.get()
+            pendentes: Dict[Path, List[bytes]] = {file_path: [data]}
+            total = 1
+            # Debounce: rajadas (ex.: várias requisições seguidas) viram uma única escrita por arquivo
+            deadline = time.monotonic() + self.WRITE_DEBOUNCE
+            while total < self.WRITE_BATCH_SIZE:
+                try:
+                    file_path, data = self._write_q.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                pendentes.setdefault(file_path, []).append(data)
+                total += 1
+
+            # Um write por arquivo, com tudo o que acumulou desde a última rodada.
+            # Cada arquivo falha sozinho: um erro no sns_log não pode descartar mensagens da fila.
+            try:
+                with self._io_lock:
+                    for file_path, chunks in pendentes.items():
+                        try:
+                            self._write_pending(file_path, chunks)
+                        except OSError as exc:
+                            log.error(Fore.RED + "[MockAWS] Falha ao gravar %s: %s", file_path, exc)
+            finally:
+                for _ in range(total):
+                    self._write_q.task_done()
+
+    def _write_pending(self, file_path: Path, chunks: List[bytes]) -> None:
+        lock_path = self._queue_locks.get(file_path)
+        if lock_path is None:
+            data = b"".join(chunks)
+            if file_path.suffix == ".gz":
+                # Cada lote vira um membro gzip completo (cabeçalho e dicionário próprios);
+                # membros concatenados formam um .gz válido
+                data = gzip.compress(data, compresslevel=1)
+            self._append_persistent(file_path, data)
+            return
+        # Filas podem ser compactadas por outro processo; o append precisa do flock
+        with _file_lock(lock_path):
+            self._append_raw(file_path, b"".join(chunks))
+
+    @staticmethod
+    def _write_all(fd: int, data: bytes) -> None:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view) :]
+
+    @classmethod
+    def _append_raw(cls, file_path: Path, data: bytes) -> None:
+        # os.open/os.write direto: sem o fstat/lseek/ioctl extras que o open() bufferizado faz
+        fd = os.open(file_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            cls._write_all(fd, data)
+        finally:
+            os.close(fd)
+
+    def _append_persistent(self, file_path: Path, data: bytes) -> None:
+        # Só o writer chama (sob _io_lock). O_APPEND mantém cada write atômico entre processos.
+        fd = self._append_fds.get(file_path)
+        if fd is None:
+            fd = os.open(file_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            self._append_fds[file_path] = fd
+        try:
+            self._write_all(fd, data)
+        except OSError:
+            # Descarta o descritor com problema; a próxima rodada reabre o arquivo
+            del self._append_fds[file_path]
+            os.close(fd)
+            raise
+
+    def flush(self) -> None:
+        """Bloqueia até que todos os appends agendados estejam no disco."""
+        self._write_q.join()
+
+    def close(self) -> None:
+        """Grava o que estiver pendente e fecha os descritores mantidos abertos."""
+        self.flush()
+        with self._io_lock:
+            for fd in self._append_fds.values():
+                os.close(fd)
+            self._append_fds.clear()
+
     def _queue_file(self, queue_name: str) -> Path:
-        file_path = self.sqs_dir / f"{queue_name}.json"
-        if not file_path.exists():
-            file_path.write_text("[]", encoding="utf-8")
+        # Fila em JSON Lines: uma mensagem por linha, envio é só um append
+        file_path = self._queue_paths.get(queue_name)
+        if file_path is None:
+            file_path = self.sqs_dir / f"{queue_name}.jsonl"
+            file_path.touch()
+            self._queue_locks[file_path] = file_path.with_suffix(".lock")
+            self._queue_paths[queue_name] = file_path
         return file_path
 
+    def queue_path(self, queue_name: str) -> Path:
+        """Arquivo JSON Lines da fila (para quem quiser observar mudanças nele)."""
+        return self._queue_file(queue_name)
+
+    @staticmethod
+    def _read_head(head_path: Path) -> int:
+        # Offset (em bytes) da próxima mensagem ainda não consumida da fila
+        if not head_path.exists():
+            return 0
+        return int(head_path.read_text(encoding="ascii") or 0)
+
+    @staticmethod
+    def _write_head(head_path: Path, offset: int) -> None:
+        _atomic_write(head_path, str(offset).encode("ascii"))
+
+    def _compact_queue(self, file_path: Path, head_path: Path, offset: int) -> None:
+        """Descarta as mensagens já consumidas e volta o head para o início do arquivo."""
+        with file_path.open("rb") as handler:
+            handler.seek(offset)
+            restante = handler.read()
+        # Zera o head antes de trocar o arquivo: uma falha no meio reentrega mensagens, nunca as perde
+        self._write_head(head_path, 0)
+        _atomic_write(file_path, restante)
+
     def send_sqs(self, queue_name: str, message: Dict[str, Any]) -> None:
         """Simula o envio de mensagem para uma fila SQS."""
-        file_path = self._queue_file(queue_name)
-        payload = json.loads(file_path.read_text(encoding="utf-8"))
-        payload.append(message)
-        file_path.write_text(json.dumps(payload, indent=2, ensure_ascii=False), encoding="utf-8")
-        print(
-            Fore.CYAN
-            + f"[AWS SQS] Mensagem adicionada na fila '{queue_name}': {json.dumps(message, ensure_ascii=False)}"
-        )
+        self._append(self._queue_file(queue_name), orjson.dumps(message) + b"\n")
+        log.info(Fore.CYAN + "[AWS SQS] Mensagem adicionada na fila '%s'.", queue_name)
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug(Fore.CYAN + "[AWS SQS] Conteúdo: %s", orjson.dumps(message).decode())
+
+    def send_sqs_many(self, queue_name: str, messages: List[Dict[str, Any]]) -> None:
+        """Envia várias mensagens para a fila com uma única abertura e escrita no arquivo."""
+        if not messages:
+            return
+        self._append(self._queue_file(queue_name), b"".join(orjson.dumps(m) + b"\n" for m in messages))
+        log.info(Fore.CYAN + "[AWS SQS] %d mensagens adicionadas na fila '%s'.", len(messages), queue_name)
 
     def receive_sqs(self, queue_name: str) -> Optional[Dict[str, Any]]:
         """Retira a primeira mensagem da fila simulada."""
-        file_path = self._queue_file(queue_name)
-        payload: List[Dict[str, Any]] = json.loads(file_path.read_text(encoding="utf-8"))
-        if not payload:
-            print(Fore.MAGENTA + f"[AWS SQS] Fila '{queue_name}' vazia...")
-            return None
+        mensagens = self.receive_sqs_batch(queue_name, max_messages=1)
+        return mensagens[0] if mensagens else None
 
-        message = payload.pop(0)
-        file_path.write_text(json.dumps(payload, indent=2, ensure_ascii=False), encoding="utf-8")
-        print(Fore.MAGENTA + f"[AWS SQS] Mensagem recuperada da fila '{queue_name}': {json.dumps(message, ensure_ascii=False)}")
-        return message
+    def receive_sqs_batch(self, queue_name: str, max_messages: int = 10) -> List[Dict[str, Any]]:
+        """Retira até max_messages mensagens da fila com uma única leitura e um único avanço do head."""
+        file_path = self._queue_file(queue_name)
+        head_path = file_path.with_suffix(".head")
+        # Envios deste processo ainda na fila do writer precisam estar no arquivo antes da leitura
+        self.flush()
+        with self._io_lock, _file_lock(self._queue_locks[file_path]):
+            offset = self._read_head(head_path)
+            with file_path.open("rb") as handler:
+                handler.seek(offset)
+                linhas: List[bytes] = []
+                while len(linhas) < max_messages:
+                    linha = handler.readline()
+                    if not linha:
+                        break
+                    linhas.append(linha)
+            if not linhas:
+                log.debug(Fore.MAGENTA + "[AWS SQS] Fila '%s' vazia...", queue_name)
+                return []
+
+            # Decodifica antes de mexer no head: uma linha corrompida (ex.: escrita cortada por um crash)
+            # vai para <fila>.invalid e as demais do lote seguem normalmente, em vez de se perderem juntas
+            mensagens: List[Dict[str, Any]] = []
+            invalidas: List[bytes] = []
+            for linha in linhas:
+                try:
+                    mensagens.append(orjson.loads(linha))
+                except orjson.JSONDecodeError:
+                    invalidas.append(linha if linha.endswith(b"\n") else linha + b"\n")
+            if invalidas:
+                self._append_raw(file_path.with_suffix(".invalid"), b"".join(invalidas))
+                log.error(
+                    Fore.RED + "[AWS SQS] %d linha(s) inválida(s) na fila '%s' movida(s) para %s.",
+                    len(invalidas),
+                    queue_name,
+                    file_path.with_suffix(".invalid"),
+                )
+
+            # Só avança o head; o arquivo é reescrito apenas quando mais da metade já foi consumida
+            offset += sum(len(linha) for linha in linhas)
+            if offset * 2 > file_path.stat().st_size:
+                self._compact_queue(file_path, head_path, offset)
+            else:
+                self._write_head(head_path, offset)
+        if not mensagens:
+            return mensagens
+        log.info(Fore.MAGENTA + "[AWS SQS] %d mensagem(ns) recuperada(s) da fila '%s'.", len(mensagens), queue_name)
+        if log.isEnabledFor(logging.DEBUG):
+            for message in mensagens:
+                log.debug(Fore.MAGENTA + "[AWS SQS] Conteúdo: %s", orjson.dumps(message).decode())
+        return mensagens
 
     def publish_sns(self, topic: str, message: str) -> None:
         """Simula o envio de uma notificação SNS."""
-        log_entry = f"{datetime.utcnow().isoformat()}Z | {topic} | {message}\n"
-        with self.sns_log.open("a", encoding="utf-8") as handler:
-            handler.write(log_entry)
-        print(Fore.YELLOW + f"[AWS SNS] Notificação enviada ao tópico '{topic}': {message}")
+        log_entry = f"{now_iso()} | {topic} | {message}\n"
+        self._append(self.sns_log, log_entry.encode("utf-8"))
+        log.info(Fore.YELLOW + "[AWS SNS] Notificação enviada ao tópico '%s': %s", topic, message)
+
+    def dump_state(self) -> None:
+        """Imprime os arquivos JSON Lines do estado simulado com indentação (só para depuração)."""
+        self.flush()
+        arquivos = [*self.state_dir.rglob("*.jsonl"), *self.state_dir.rglob("*.jsonl.gz")]
+        for file_path in sorted(arquivos):
+            print(Fore.WHITE + Style.BRIGHT + f"== {file_path.relative_to(self.state_dir)}")
+            if file_path.suffix == ".gz":
+                handler = gzip.open(file_path, "rb")
+            else:
+                handler = file_path.open("rb")
+                handler.seek(self._read_head(file_path.with_suffix(".head")))
+            with handler:
+                for linha in handler:
+                    print(orjson.dumps(orjson.loads(linha), option=orjson.OPT_INDENT_2).decode())
 
     def invoke_lambda(self, name: str, handler, payload: Dict[str, Any]) -> Any:
         """Simula a invocação de uma função Lambda."""
-        print(Fore.GREEN + f"[AWS Lambda] Invocando '{name}' com payload: {json.dumps(payload, ensure_ascii=False)}")
-        result = handler(payload, context={"invoked_at": datetime.utcnow().isoformat()})
-        print(Fore.GREEN + f"[AWS Lambda] Execução '{name}' finalizada.\n")
+        log.info(Fore.GREEN + "[AWS Lambda] Invocando '%s'.", name)
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug(Fore.GREEN + "[AWS Lambda] Payload: %s", orjson.dumps(payload).decode())
+        result = handler(payload, context={"invoked_at": now_iso()})
+        log.info(Fore.GREEN + "[AWS Lambda] Execução '%s' finalizada.\n", name)
         return result
 
 
 # Instância única compartilhada pelos módulos
 mock_aws = MockAWS()
 
+# SIMULATE_LATENCY=1 reativa as pausas "de rede" do announcer/notifier; desligado, o worker não fica parado
+SIMULATE_LATENCY = _env_flag("SIMULATE_LATENCY")
+
+
+def _latencia_simulada(segundos: float) -> None:
+    """Pausa simbólica de rede, só quando SIMULATE_LATENCY está ligado."""
+    if SIMULATE_LATENCY:
+        time.sleep(segundos)
+
+
+# Gerador próprio do matchmaker; MATCHMAKER_SEED fixa o sorteio (útil para reproduzir uma chave)
+_rng = random.Random(os.getenv("MATCHMAKER_SEED") or None)
+
 
 def lambda_matchmaker(event: Dict[str, Any], context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
     """Recebe a lista de atletas e monta os confrontos da chave."""
     atletas: List[Dict[str, Any]] = event.get("atletas", [])
     if len(atletas) < 2:
-        print(Fore.RED + "[Lambda Matchmaker] Número insuficiente de atletas para gerar chaves.")
+        log.warning(Fore.RED + "[Lambda Matchmaker] Número insuficiente de atletas para gerar chaves.")
         return {"confrontos": []}
 
-    embaralhados = atletas[:]
-    random.shuffle(embaralhados)
-
-    confrontos = []
-    for idx in range(0, len(embaralhados), 2):
-        dupla = embaralhados[idx : idx + 2]
-        luta_id = f"LUTA-{idx // 2 + 1}"
-        if len(dupla) == 2:
-            confrontos.append(
-                {
-                    "luta_id": luta_id,
-                    "atletas": dupla,
-                    "round": "Classificatórias",
-                }
-            )
-        else:
-            # Último atleta sem par recebe bye
-            confrontos.append(
-                {
-                    "luta_id": f"{luta_id}-BYE",
-                    "atletas": dupla,
-                    "round": "Avanço Automático",
-                }
-            )
-
-    print(
-        Fore.BLUE
-        + f"[Lambda Matchmaker] {len(confrontos)} confrontos gerados para {len(atletas)} atletas."
+    # Sorteia uma vez a ordem dos atletas; zip sobre o mesmo iterador forma os pares sem aritmética de índice
+    total = len(atletas)
+    sorteados = _rng.sample(atletas, total)
+    pares = iter(sorteados)
+
+    confrontos = [
+        {"luta_id": f"LUTA-{num}", "atletas": [a, b], "round": "Classificatórias"}
+        for num, (a, b) in enumerate(zip(pares, pares), start=1)
+    ]
+    if total % 2:
+        # Último atleta sem par recebe bye
+        confrontos.append(
+            {
+                "luta_id": f"LUTA-{total // 2 + 1}-BYE",
+                "atletas": [sorteados[-1]],
+                "round": "Avanço Automático",
+            }
+        )
+
+    log.info(
+        Fore.BLUE + "[Lambda Matchmaker] %d confrontos gerados para %d atletas.", len(confrontos), len(atletas)
     )
-    return {"confrontos": confrontos, "gerado_em": datetime.utcnow().isoformat() + "Z"}
+    return {"confrontos": confrontos, "gerado_em": now_iso()}
 
 
 def lambda_announcer(event: Dict[str, Any], context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
@@ -125,37 +376,44 @@ def lambda_announcer(event: Dict[str, Any], context: Optional[Dict[str, Any]] =
     atletas_nomes = " vs ".join(a.get("nome", "??") for a in atletas) or "Participantes indefinidos"
     mensagem = f"{round_name} - {luta_id}: {atletas_nomes}. Dirijam-se ao tatame!"
 
-    print(Fore.WHITE + Style.BRIGHT + f"[Lambda Announcer] Preparando anúncio da luta {luta_id}.")
+    log.info(Fore.WHITE + Style.BRIGHT + "[Lambda Announcer] Preparando anúncio da luta %s.", luta_id)
     mock_aws.publish_sns(topic="jiujitsu-lutas", message=mensagem)
-    time.sleep(0.5)  # Latência simbólica
+    _latencia_simulada(0.5)
     return {"status": "ANNOUNCED", "mensagem": mensagem}
 
 
 def lambda_historian(event: Dict[str, Any], context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
-    """Persiste o resultado em um log JSON (simulando backup S3)."""
-    backup_dir = mock_aws.state_dir / "backups"
-    backup_dir.mkdir(exist_ok=True)
-    backup_file = backup_dir / "historian_logs.json"
-
-    if not backup_file.exists():
-        backup_file.write_text("[]", encoding="utf-8")
+    """Persiste o resultado em um log JSON Lines (simulando backup S3)."""
+    # JSON Lines: cada backup é um append de tamanho constante, independente do histórico,
+    # gravado pelo writer do MockAWS no descritor que ele mantém aberto
+    backup_file = mock_aws.historian_log
 
     log_entry = {
         "luta_id": event.get("luta_id"),
         "vencedor": event.get("vencedor"),
         "submitido_por": event.get("submitido_por", "N/A"),
-        "registrado_em": datetime.utcnow().isoformat() + "Z",
+        "registrado_em": now_iso(),
         "extra": event.get("extra", {}),
     }
 
-    dados = json.loads(backup_file.read_text(encoding="utf-8"))
-    dados.append(log_entry)
-    backup_file.write_text(json.dumps(dados, indent=2, ensure_ascii=False), encoding="utf-8")
+    mock_aws._append(backup_file, orjson.dumps(log_entry) + b"\n")
 
-    print(Fore.LIGHTBLACK_EX + f"[Lambda Historian] Resultado salvo em {backup_file}.")
+    log.info(Fore.LIGHTBLACK_EX + "[Lambda Historian] Resultado salvo em %s.", backup_file)
     return {"status": "BACKED_UP", "arquivo": str(backup_file)}
 
 
+# Valores aceitos pelo validador: tuplas preservam a ordem das mensagens, frozensets fazem o teste em O(1).
+# Como o JSON pode trazer listas/dicts (não hasheáveis), o validador confere o tipo antes do "in".
+# Internados: sys.intern(valor_recebido) devolve exatamente estes objetos, um por faixa/categoria.
+FAIXAS_VALIDAS = tuple(map(sys.intern, ("Branca", "Azul", "Roxa", "Marrom", "Preta")))
+CATEGORIAS_VALIDAS = tuple(map(sys.intern, ("Peso Leve", "Peso Médio", "Peso Pesado", "Absoluto")))
+_FAIXAS = frozenset(FAIXAS_VALIDAS)
+_CATEGORIAS = frozenset(CATEGORIAS_VALIDAS)
+_ERRO_NOME = "Nome deve ter pelo menos 3 caracteres"
+_ERRO_FAIXA = f"Faixa inválida. Use uma das: {', '.join(FAIXAS_VALIDAS)}"
+_ERRO_CATEGORIA = f"Categoria inválida. Use uma das: {', '.join(CATEGORIAS_VALIDAS)}"
+
+
 def lambda_validator(event: Dict[str, Any], context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
     """Valida dados de atletas antes do cadastro."""
     atleta = event.get("atleta", {})
@@ -163,58 +421,64 @@ def lambda_validator(event: Dict[str, Any], context: Optional[Dict[str, Any]] =
 
     # Validação de nome
     nome = atleta.get("nome", "").strip()
-    if not nome or len(nome) < 3:
-        erros.append("Nome deve ter pelo menos 3 caracteres")
+    if len(nome) < 3:
+        erros.append(_ERRO_NOME)
 
     # Validação de faixa
-    faixas_validas = ["Branca", "Azul", "Roxa", "Marrom", "Preta"]
     faixa = atleta.get("faixa", "")
-    if faixa not in faixas_validas:
-        erros.append(f"Faixa inválida. Use uma das: {', '.join(faixas_validas)}")
+    if not isinstance(faixa, str) or faixa not in _FAIXAS:
+        erros.append(_ERRO_FAIXA)
 
     # Validação de categoria
-    categorias_validas = ["Peso Leve", "Peso Médio", "Peso Pesado", "Absoluto"]
     categoria = atleta.get("categoria", "")
-    if categoria not in categorias_validas:
-        erros.append(f"Categoria inválida. Use uma das: {', '.join(categorias_validas)}")
+    if not isinstance(categoria, str) or categoria not in _CATEGORIAS:
+        erros.append(_ERRO_CATEGORIA)
 
     if erros:
-        print(Fore.RED + f"[Lambda Validator] Validação falhou: {', '.join(erros)}")
+        log.warning(Fore.RED + "[Lambda Validator] Validação falhou: %s", ", ".join(erros))
         return {"valido": False, "erros": erros}
 
-    print(Fore.GREEN + f"[Lambda Validator] Atleta '{nome}' validado com sucesso.")
+    # Troca as strings vindas do JSON pelas instâncias únicas: atletas da mesma faixa compartilham o objeto
+    atleta["faixa"] = sys.intern(faixa)
+    atleta["categoria"] = sys.intern(categoria)
+    log.info(Fore.GREEN + "[Lambda Validator] Atleta '%s' validado com sucesso.", nome)
     return {"valido": True, "atleta": atleta}
 
 
+def _nome_vencedor(resultado: Dict[str, Any]) -> Optional[str]:
+    """Extrai o nome do vencedor de um resultado (dict do atleta ou valor simples)."""
+    vencedor = resultado.get("vencedor", {})
+    return vencedor.get("nome") if isinstance(vencedor, dict) else str(vencedor)
+
+
 def lambda_statistics(event: Dict[str, Any], context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
     """Calcula estatísticas e rankings dos atletas."""
     resultados = event.get("resultados", [])
-    atletas = event.get("atletas", [])
+    total_atletas = event.get("total_atletas", len(event.get("atletas", [])))
 
     # Contagem de vitórias por atleta
-    vitorias = {}
-    for resultado in resultados:
-        vencedor = resultado.get("vencedor", {})
-        nome = vencedor.get("nome") if isinstance(vencedor, dict) else str(vencedor)
-        if nome:
-            vitorias[nome] = vitorias.get(nome, 0) + 1
+    vitorias = Counter(nome for nome in map(_nome_vencedor, resultados) if nome)
 
-    # Ranking ordenado por vitórias
-    ranking = sorted(vitorias.items(), key=lambda x: x[1], reverse=True)
+    # Ranking ordenado por vitórias (empates mantêm a ordem de chegada)
+    ranking = vitorias.most_common()
 
     # Estatísticas gerais
     total_lutas = len(resultados)
-    atletas_unicos = len(set(vitorias.keys()))
+    atletas_unicos = len(vitorias)
 
     stats = {
         "total_lutas": total_lutas,
         "atletas_com_vitorias": atletas_unicos,
-        "total_atletas": len(atletas),
-        "ranking": [{"atleta": nome, "vitorias": vitorias} for nome, vitorias in ranking],
-        "calculado_em": datetime.utcnow().isoformat() + "Z",
+        "total_atletas": total_atletas,
+        "ranking": [{"atleta": nome, "vitorias": total} for nome, total in ranking],
+        "calculado_em": now_iso(),
     }
 
-    print(Fore.CYAN + f"[Lambda Statistics] Estatísticas calculadas: {total_lutas} lutas, {atletas_unicos} vencedores.")
+    log.info(
+        Fore.CYAN + "[Lambda Statistics] Estatísticas calculadas: %d lutas, %d vencedores.",
+        total_lutas,
+        atletas_unicos,
+    )
     return stats
 
 
@@ -227,30 +491,35 @@ def lambda_notifier(event: Dict[str, Any], context: Optional[Dict[str, Any]] = N
     nome_vencedor = vencedor.get("nome") if isinstance(vencedor, dict) else str(vencedor)
     mensagem = f"Resultado da {luta_id}: {nome_vencedor} venceu por {metodo}!"
 
-    print(Fore.WHITE + Style.BRIGHT + f"[Lambda Notifier] Enviando notificação do resultado da {luta_id}.")
+    log.info(Fore.WHITE + Style.BRIGHT + "[Lambda Notifier] Enviando notificação do resultado da %s.", luta_id)
     mock_aws.publish_sns(topic="jiujitsu-resultados", message=mensagem)
-    time.sleep(0.3)
+    _latencia_simulada(0.3)
 
     return {"status": "NOTIFIED", "mensagem": mensagem}
 
 
+MINUTOS_POR_LUTA = 15
+_TATAMES = ("Secundário", "Principal")  # lutas ímpares (idx & 1 == 1) vão para o Principal
+
+
 def lambda_scheduler(event: Dict[str, Any], context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
     """Simula agendamento automático de lutas baseado nas chaves."""
     chaves = event.get("chaves", [])
-    lutas_agendadas = []
+    agendado_em = now_iso()  # o lote inteiro é agendado no mesmo instante
 
-    for idx, chave in enumerate(chaves, 1):
-        luta_agendada = {
+    lutas_agendadas = [
+        {
             "luta_id": chave.get("luta_id"),
             "atletas": chave.get("atletas", []),
             "round": chave.get("round", "Classificatórias"),
-            "horario_previsto": f"{(idx * 15) // 60:02d}:{(idx * 15) % 60:02d}",
-            "tatame": "Principal" if idx % 2 == 1 else "Secundário",
-            "agendado_em": datetime.utcnow().isoformat() + "Z",
+            "horario_previsto": "%02d:%02d" % divmod(idx * MINUTOS_POR_LUTA, 60),
+            "tatame": _TATAMES[idx & 1],
+            "agendado_em": agendado_em,
         }
-        lutas_agendadas.append(luta_agendada)
+        for idx, chave in enumerate(chaves, 1)
+    ]
 
-    print(Fore.MAGENTA + f"[Lambda Scheduler] {len(lutas_agendadas)} lutas agendadas automaticamente.")
+    log.info(Fore.MAGENTA + "[Lambda Scheduler] %d lutas agendadas automaticamente.", len(lutas_agendadas))
     return {"lutas_agendadas": lutas_agendadas, "total": len(lutas_agendadas)}
 
 
@@ -266,3 +535,9 @@ __all__ = [
 ]
 
 
+if __name__ == "__main__":
+    # Os arquivos de estado são gravados compactos; para inspecionar: python lambdas.py --pretty
+    if "--pretty" in sys.argv[1:]:
+        mock_aws.dump_state()
+    else:
+        print("Uso: python lambdas.py --pretty")
@@ -0,0 +1,27 @@
+-- Esquema do banco SQLite do torneio (carregado por app.py na inicialização)
+
+CREATE TABLE IF NOT EXISTS atletas (
+    id INTEGER PRIMARY KEY,
+    nome TEXT NOT NULL,
+    faixa TEXT NOT NULL,
+    categoria TEXT NOT NULL,
+    equipe TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS chaves (
+    id INTEGER PRIMARY KEY,
+    luta_id TEXT NOT NULL,
+    atletas_json TEXT NOT NULL,
+    round TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS resultados (
+    id INTEGER PRIMARY KEY,
+    luta_id TEXT NOT NULL,
+    vencedor_json TEXT NOT NULL,
+    metodo TEXT NOT NULL,
+    tempo TEXT NOT NULL,
+    registrado_em TEXT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_resultados_luta_id ON resultados (luta_id);
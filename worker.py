@@ -1,48 +1,126 @@
-import time
-from typing import Optional
-
-from colorama import Fore, Style, init
+import asyncio
+import logging
+from typing import Any, Callable, Dict, Optional, Set
 
+from common import Fore, Style, configure_logging
 from lambdas import lambda_announcer, mock_aws
 
-# Configura Colorama para logs bonitos no Windows/macOS/Linux
-init(autoreset=True)
+try:
+    from watchdog.events import FileSystemEvent, FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:  # watchdog é opcional; sem ele o worker faz polling com backoff
+    Observer = None
+
+log = logging.getLogger("torneio.worker")
 
 QUEUE_NAME = "lutas"
-POLL_INTERVAL = 3  # segundos
+POLL_INTERVAL = 3  # segundos (espera máxima entre leituras com a fila vazia)
+MIN_POLL_INTERVAL = 0.05  # segundos (primeira espera após a fila esvaziar)
+BATCH_SIZE = 16  # mensagens retiradas da fila por leitura
+MAX_IN_FLIGHT = 8  # anúncios em andamento ao mesmo tempo
 
 
-def process_next_message() -> Optional[dict]:
-    """Busca uma mensagem na fila simulada e aciona a Lambda Announcer."""
-    message = mock_aws.receive_sqs(QUEUE_NAME)
-    if not message:
+def _watch_queue(wake: Callable[[], None]) -> Optional["Observer"]:
+    """Acorda o worker assim que o arquivo da fila muda (inotify/FSEvents/ReadDirectoryChangesW)."""
+    if Observer is None:
         return None
 
-    mock_aws.invoke_lambda("Lambda 2 - Announcer", lambda_announcer, message)
-    return message
+    queue_file = str(mock_aws.queue_path(QUEUE_NAME))
+
+    class QueueChangeHandler(FileSystemEventHandler):
+        # Só eventos de escrita: 'opened'/'closed_no_write' vêm da própria leitura do worker
+        # e, se acordassem o loop, o deixariam girando sem parar com a fila vazia
+        def on_modified(self, event: FileSystemEvent) -> None:
+            # Appends do send_sqs
+            if event.src_path == queue_file:
+                wake()
+
+        def on_created(self, event: FileSystemEvent) -> None:
+            if event.src_path == queue_file:
+                wake()
+
+        def on_moved(self, event: FileSystemEvent) -> None:
+            # A compactação (os.replace) chega como 'moved' com o arquivo da fila em dest_path
+            if event.dest_path == queue_file:
+                wake()
+
+    observer = Observer()
+    observer.schedule(QueueChangeHandler(), str(mock_aws.sqs_dir))
+    observer.daemon = True
+    observer.start()
+    return observer
+
+
+async def _announce(message: Dict[str, Any], sem: asyncio.Semaphore) -> None:
+    """Roda a Lambda Announcer numa thread do executor e libera a vaga ao terminar."""
+    loop = asyncio.get_running_loop()
+    try:
+        await loop.run_in_executor(None, mock_aws.invoke_lambda, "Lambda 2 - Announcer", lambda_announcer, message)
+    except Exception as exc:  # noqa: BLE001 - log simples para demo
+        log.error(Fore.RED + "[Worker] Falha ao anunciar %s: %s", message.get("luta_id"), exc)
+    finally:
+        sem.release()
+
+
+async def run_worker() -> None:
+    """Consome a fila mantendo até MAX_IN_FLIGHT anúncios em paralelo enquanto busca o próximo lote."""
+    loop = asyncio.get_running_loop()
+    wake = asyncio.Event()
+    # O watchdog avisa de outra thread; call_soon_threadsafe leva o set() para o loop
+    observer = _watch_queue(lambda: loop.call_soon_threadsafe(wake.set))
+    if observer is None:
+        log.info("[Worker] watchdog não instalado; usando polling com backoff.")
+
+    sem = asyncio.Semaphore(MAX_IN_FLIGHT)
+    in_flight: Set["asyncio.Task[None]"] = set()
+    # Backoff exponencial: volta a ler rápido logo depois de uma mensagem, espaça quando ociosa
+    delay = MIN_POLL_INTERVAL
+    try:
+        while True:
+            # Limpa antes de ler: um envio durante a leitura deixa o evento marcado para a próxima volta
+            wake.clear()
+            try:
+                messages = await loop.run_in_executor(None, mock_aws.receive_sqs_batch, QUEUE_NAME, BATCH_SIZE)
+            except Exception as exc:  # noqa: BLE001 - log simples para demo
+                log.error(Fore.RED + "[Worker] Erro inesperado: %s", exc)
+                await asyncio.sleep(POLL_INTERVAL)
+                continue
+
+            for message in messages:
+                # Sem vaga livre, espera aqui: a próxima leitura só acontece quando algum anúncio terminar
+                await sem.acquire()
+                task = asyncio.create_task(_announce(message, sem))
+                in_flight.add(task)
+                task.add_done_callback(in_flight.discard)
+
+            if messages:
+                delay = MIN_POLL_INTERVAL
+            elif observer is not None:
+                # POLL_INTERVAL fica só como rede de segurança caso algum evento se perca
+                try:
+                    await asyncio.wait_for(wake.wait(), POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+            else:
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, POLL_INTERVAL)
+    finally:
+        if observer is not None:
+            observer.stop()
+        # Mensagens já retiradas da fila terminam de ser anunciadas antes de sair
+        if in_flight:
+            await asyncio.gather(*in_flight, return_exceptions=True)
 
 
 def main():
-    print(
-        Fore.WHITE
-        + Style.BRIGHT
-        + "[Worker] Iniciando consumidor da fila 'lutas'. Pressione CTRL+C para sair."
-    )
-    while True:
-        try:
-            processed = process_next_message()
-            if not processed:
-                time.sleep(POLL_INTERVAL)
-        except KeyboardInterrupt:
-            print(Fore.RED + "[Worker] Encerrado manualmente.")
-            break
-        except Exception as exc:  # noqa: BLE001 - log simples para demo
-            print(Fore.RED + f"[Worker] Erro inesperado: {exc}")
-            time.sleep(POLL_INTERVAL)
+    log.info(Fore.WHITE + Style.BRIGHT + "[Worker] Iniciando consumidor da fila 'lutas'. Pressione CTRL+C para sair.")
+    try:
+        asyncio.run(run_worker())
+    except KeyboardInterrupt:
+        log.warning(Fore.RED + "[Worker] Encerrado manualmente.")
 
 
 if __name__ == "__main__":
-    # Executar em um terminal separado: python worker.py
+    # Executar em um terminal separado: python worker.py (LOG_LEVEL=WARNING deixa só avisos e erros)
+    configure_logging()
     main()
-
-